@@ -10,10 +10,26 @@ import sys
 import subprocess
 import json
 import argparse
+import base64
+import http.client
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from functools import lru_cache
+from collections.abc import Callable, Iterator
 from pathlib import Path
-from urllib.parse import urljoin
-from urllib.request import urlopen, Request
-from urllib.error import HTTPError, URLError
+from urllib.parse import quote, unquote, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+from urllib.error import HTTPError
+
+try:
+    import orjson  # 可选依赖，解析大目录列表更快
+except ImportError:
+    orjson = None
+
+json_loads = orjson.loads if orjson is not None else json.loads
 
 # ANSI 颜色码
 RED = "\033[91m"
@@ -28,6 +44,31 @@ SKIP_FILENAMES: frozenset[str] = frozenset({
     ".DS_Store",
 })
 
+# 下载记录文件名，保存在下载目录下，记录已下载文件的大小、修改时间与 ETag
+SIDECAR_NAME = ".dufs_cache.json"
+_SIDECAR_LOCK = threading.Lock()
+
+# dufs JSON 列表中表示目录的 path_type
+DIR_PATH_TYPES: frozenset[str] = frozenset({"Dir", "SymlinkDir"})
+
+# 各服务端是否支持 ?json 目录列表，首次列目录时探测，base_url -> bool
+_SUPPORTS_JSON: dict[str, bool] = {}
+
+# 目录列表缓存：(base_url, path) -> (获取时间, 列表)，在有效期内返回上一级等操作不再重新请求
+LISTING_TTL = 30
+LISTING_CACHE_SIZE = 256
+_LISTINGS: dict[tuple[str, str], tuple[float, tuple[tuple[str, bool, int | None, int | None], ...]]] = {}
+_LISTINGS_LOCK = threading.Lock()
+
+# 递归遍历目录时并发列目录的线程数
+CRAWL_WORKERS = 16
+# 下载文件夹时并发下载的文件数
+DOWNLOAD_WORKERS = 8
+# 文件夹下载被中断（Ctrl-C）时置位，通知工作线程停止
+_CANCEL_DOWNLOADS = threading.Event()
+# 内置下载每次读取的字节数
+DOWNLOAD_CHUNK_SIZE = 128 * 1024
+
 
 def normalize_base_url(url: str) -> str:
     """Normalize base URL for direct use."""
@@ -37,25 +78,153 @@ def normalize_base_url(url: str) -> str:
     return url
 
 
+def dir_url(base_url: str, path: str) -> str:
+    """Build the URL of a remote directory (with trailing slash). base_url must be normalized.
+    path is a raw (unescaped) remote path and is percent-encoded here."""
+    path = quote(path.strip("/"), safe="/")
+    return f"{base_url}/{path}/" if path else f"{base_url}/"
+
+
+def file_url(base_url: str, remote_path: str) -> str:
+    """Build the URL of a remote file. base_url must be normalized.
+    remote_path is a raw (unescaped) remote path and is percent-encoded here."""
+    return f"{base_url}/{quote(remote_path.lstrip('/'), safe='/')}"
+
+
+# 连接池：按 (scheme, netloc) 缓存空闲的 keep-alive 连接，避免每个请求都重新握手
+_POOL_MAXSIZE = 16
+_POOL: dict[tuple[str, str], list[http.client.HTTPConnection]] = {}
+_POOL_LOCK = threading.Lock()
+# 最多跟随的重定向次数
+MAX_REDIRECTS = 5
+
+
+@lru_cache(maxsize=None)
+def _proxy_for(scheme: str, netloc: str) -> tuple[str, dict[str, str]] | None:
+    """Return (proxy netloc, proxy auth headers) from http_proxy/https_proxy for this host, or None.
+    no_proxy is honoured like urlopen does."""
+    proxy = getproxies().get(scheme)
+    if not proxy or proxy_bypass(urlsplit(f"{scheme}://{netloc}").hostname or netloc):
+        return None
+    parts = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    headers = {}
+    if parts.username is not None:
+        cred = f"{unquote(parts.username)}:{unquote(parts.password or '')}".encode()
+        headers["Proxy-Authorization"] = "Basic " + base64.b64encode(cred).decode()
+    return parts.netloc.rpartition("@")[2], headers
+
+
+def _get_connection(scheme: str, netloc: str, timeout: float, fresh: bool = False) -> tuple[http.client.HTTPConnection, bool]:
+    """Take an idle connection from the pool, or open a new one. Returns (conn, reused)."""
+    conn = None
+    if not fresh:
+        with _POOL_LOCK:
+            idle = _POOL.get((scheme, netloc))
+            if idle:
+                conn = idle.pop()
+    if conn is None:
+        proxy = _proxy_for(scheme, netloc)
+        if proxy is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            return cls(netloc, timeout=timeout), False
+        proxy_netloc, proxy_headers = proxy
+        if scheme == "https":
+            # HTTPS 通过 CONNECT 隧道访问
+            conn = http.client.HTTPSConnection(proxy_netloc, timeout=timeout)
+            conn.set_tunnel(netloc, headers=proxy_headers)
+        else:
+            conn = http.client.HTTPConnection(proxy_netloc, timeout=timeout)
+        return conn, False
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return conn, True
+
+
+def _release_connection(scheme: str, netloc: str, conn: http.client.HTTPConnection) -> None:
+    """Return a connection to the pool, closing it if the pool is full."""
+    with _POOL_LOCK:
+        idle = _POOL.setdefault((scheme, netloc), [])
+        if len(idle) < _POOL_MAXSIZE:
+            idle.append(conn)
+            return
+    conn.close()
+
+
+@contextmanager
+def open_url(
+    url: str,
+    method: str = "GET",
+    headers: dict[str, str] | None = None,
+    timeout: float = 30,
+) -> Iterator[http.client.HTTPResponse]:
+    """Send a request over a pooled keep-alive connection and yield the response.
+    Follows redirects and honours http_proxy/https_proxy like urlopen. Raises HTTPError on any status
+    other than 2xx and 304. The connection is returned to the pool only when the response body has
+    been fully read."""
+    for redirects in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        scheme, netloc = parts.scheme, parts.netloc
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        req_headers = dict(headers or {})
+        proxy = _proxy_for(scheme, netloc)
+        if proxy is not None and scheme == "http":
+            # 经 HTTP 代理时请求行使用绝对 URL
+            target = f"http://{netloc}{target}"
+            req_headers.update(proxy[1])
+        for attempt in range(2):
+            conn, reused = _get_connection(scheme, netloc, timeout, fresh=attempt > 0)
+            try:
+                conn.request(method, target, headers=req_headers)
+                resp = conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                if reused:
+                    continue  # 空闲连接可能已被服务端关闭，换新连接重试一次
+                raise
+            break
+        location = resp.getheader("Location")
+        if resp.status not in (301, 302, 303, 307, 308) or not location:
+            break
+        if redirects == MAX_REDIRECTS:
+            # 重定向次数超限，连接尚未放回连接池，直接关闭
+            conn.close()
+            raise HTTPError(url, resp.status, "Too many redirects", resp.headers, None)
+        # 丢弃重定向响应体，连接放回连接池后请求新地址
+        try:
+            resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+        else:
+            _release_connection(scheme, netloc, conn)
+        url = urljoin(url, location)
+    try:
+        if not (200 <= resp.status < 300 or resp.status == 304):
+            raise HTTPError(url, resp.status, resp.reason, resp.headers, None)
+        yield resp
+    except BaseException:
+        conn.close()
+        raise
+    if resp.isclosed():
+        _release_connection(scheme, netloc, conn)
+    else:
+        conn.close()
+
+
 def fetch_json(base_url: str, path: str = "") -> dict:
     """Fetch directory listing in JSON format."""
-    url = urljoin(base_url + "/", (path or ".").lstrip("/") + "/")
-    if not url.endswith("/"):
-        url += "/"
-    url += "?json"
-    req = Request(url)
-    with urlopen(req, timeout=30) as resp:
-        return json.loads(resp.read().decode())
-
-
-def fetch_simple(base_url: str, path: str = "") -> list[tuple[str, bool]]:
-    """Fetch directory listing in simple format (fallback), returns [(name, is_dir), ...]"""
-    url = urljoin(base_url + "/", (path or ".").lstrip("/") + "/")
-    if not url.endswith("/"):
-        url += "/"
-    url += "?simple"
-    req = Request(url)
-    with urlopen(req, timeout=30) as resp:
+    url = dir_url(base_url, path) + "?json"
+    with open_url(url, timeout=30) as resp:
+        return json_loads(resp.read())
+
+
+def fetch_simple(base_url: str, path: str = "") -> list[tuple[str, bool, int | None, int | None]]:
+    """Fetch directory listing in simple format (fallback), returns [(name, is_dir, size, mtime), ...].
+    The simple format carries no sizes or times, so size and mtime are always None."""
+    url = dir_url(base_url, path) + "?simple"
+    with open_url(url, timeout=30) as resp:
         lines = resp.read().decode().strip().split("\n")
     result = []
     for line in lines:
@@ -63,87 +232,415 @@ def fetch_simple(base_url: str, path: str = "") -> list[tuple[str, bool]]:
             continue
         is_dir = line.endswith("/")
         name = line.rstrip("/")
-        result.append((name, is_dir))
+        result.append((name, is_dir, None, None))
     return result
 
 
-def list_directory(base_url: str, path: str = "") -> list[tuple[str, bool]]:
-    """List directory contents, returns [(name, is_dir), ...].
+def _list_directory_uncached(base_url: str, path: str = "") -> list[tuple[str, bool, int | None, int | None]]:
+    """List directory contents from the server, returns [(name, is_dir, size, mtime), ...].
+    size is the file size in bytes and mtime the modification time in ms as reported by dufs,
+    both None for directories or when unknown.
     Dufs JSON uses path_type: "Dir"|"SymlinkDir"|"File"|"SymlinkFile"
+    Whether the server supports ?json is probed on the first listing and remembered per base_url.
     """
-    try:
-        data = fetch_json(base_url, path)
-        paths = data.get("paths", [])
-        result = []
-        for p in paths:
-            name = p.get("name", "")
-            if not name and "href" in p:
-                href = p["href"].rstrip("/")
-                name = href.split("/")[-1] if href else ""
-            path_type = p.get("path_type", "")
-            is_dir = str(path_type).endswith("Dir")  # Dir, SymlinkDir
-            result.append((name, is_dir))
-        return result
-    except (KeyError, TypeError):
+    supported = _SUPPORTS_JSON.get(base_url)
+    if supported is False:
         return fetch_simple(base_url, path)
+    if supported is None:
+        # 只有服务端正常应答（2xx）却不是 JSON 时才认定不支持；网络错误、响应截断等不记录结果
+        with open_url(dir_url(base_url, path) + "?json", timeout=30) as resp:
+            content_type = resp.getheader("Content-Type", "")
+            body = resp.read()
+        if "json" not in content_type.lower():
+            _SUPPORTS_JSON[base_url] = False
+            return fetch_simple(base_url, path)
+        paths = json_loads(body).get("paths", [])
+        _SUPPORTS_JSON[base_url] = True
+    else:
+        paths = fetch_json(base_url, path).get("paths", [])
+    result = []
+    append = result.append
+    for p in paths:
+        name = p.get("name", "")
+        if not name and "href" in p:
+            href = p["href"].rstrip("/")
+            name = href.split("/")[-1] if href else ""
+        is_dir = p.get("path_type", "") in DIR_PATH_TYPES
+        if is_dir:
+            append((name, True, None, None))  # 目录的 size 是子项数量，不使用
+        else:
+            append((name, False, p.get("size"), p.get("mtime")))
+    return result
+
+
+def list_directory(base_url: str, path: str = "") -> list[tuple[str, bool, int | None, int | None]]:
+    """List directory contents, returns [(name, is_dir, size, mtime), ...].
+    Listings are cached per (base_url, path) for LISTING_TTL seconds; call invalidate_listings() to refresh."""
+    key = (base_url, path)
+    now = time.monotonic()
+    with _LISTINGS_LOCK:
+        hit = _LISTINGS.get(key)
+    if hit is not None and now - hit[0] < LISTING_TTL:
+        return list(hit[1])
+    result = _list_directory_uncached(base_url, path)
+    with _LISTINGS_LOCK:
+        if len(_LISTINGS) >= LISTING_CACHE_SIZE:
+            # 先清理过期的列表，仍然过多时全部丢弃
+            for k in [k for k, (t, _) in _LISTINGS.items() if now - t >= LISTING_TTL]:
+                del _LISTINGS[k]
+            if len(_LISTINGS) >= LISTING_CACHE_SIZE:
+                _LISTINGS.clear()
+        _LISTINGS[key] = (now, tuple(result))
+    return result
+
+
+def invalidate_listings() -> None:
+    """Drop all cached directory listings."""
+    with _LISTINGS_LOCK:
+        _LISTINGS.clear()
 
 
 def get_remote_size(base_url: str, remote_path: str) -> int | None:
     """Get remote file size, returns None on failure."""
-    url = urljoin(base_url + "/", remote_path.lstrip("/"))
-    req = Request(url, method="HEAD")
+    url = file_url(base_url, remote_path)
     try:
-        with urlopen(req, timeout=10) as resp:
+        with open_url(url, method="HEAD", timeout=10) as resp:
+            resp.read()
             cl = resp.headers.get("Content-Length")
             return int(cl) if cl is not None else None
     except Exception:
         return None
 
 
-def download_file(base_url: str, remote_path: str, local_path: Path) -> tuple[bool, bool]:
+def response_validator(resp: http.client.HTTPResponse) -> str | None:
+    """Value identifying the version of the response body, usable in If-Range:
+    the ETag if strong, otherwise Last-Modified. None if the server sends neither."""
+    etag = resp.getheader("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return resp.getheader("Last-Modified")
+
+
+def get_remote_validator(base_url: str, remote_path: str) -> str | None:
+    """Get the current validator of a remote file (see response_validator), returns None on failure."""
+    url = file_url(base_url, remote_path)
+    try:
+        with open_url(url, method="HEAD", timeout=10) as resp:
+            resp.read()
+            return response_validator(resp)
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=None)
+def load_sidecar(save_dir: Path) -> dict[str, dict]:
+    """Load the download record kept in save_dir, read once per save_dir.
+    Maps local path (relative to save_dir) -> {"remote", "size", "mtime_ns", "etag", "remote_mtime"}.
+    size/mtime_ns describe the local file, etag/remote_mtime the remote version it was downloaded from.
+    An unfinished download "<path>.part" maps to {"remote", "validator"}, the version its bytes belong to.
+    The returned dict is shared and updated in place; save_sidecar() writes it back."""
+    try:
+        data = json_loads((save_dir / SIDECAR_NAME).read_bytes())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def sidecar_key(save_dir: Path, local_path: Path) -> str | None:
+    """Key of local_path in save_dir's sidecar, or None if it resolves outside save_dir (e.g. via a symlink).
+    save_dir must already be resolved."""
+    local_path = local_path.resolve()
+    return local_path.relative_to(save_dir).as_posix() if local_path.is_relative_to(save_dir) else None
+
+
+def save_sidecar(save_dir: Path) -> None:
+    """Write the download record of save_dir back to disk."""
+    with _SIDECAR_LOCK:
+        data = json.dumps(load_sidecar(save_dir), ensure_ascii=False)
+    path = save_dir / SIDECAR_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass  # 记录只用于加速，写入失败不影响下载结果
+
+
+def record_download(
+    sidecar: dict[str, dict] | None,
+    key: str | None,
+    remote_path: str,
+    local_path: Path,
+    etag: str | None,
+    remote_mtime: int | None,
+) -> None:
+    """Remember that local_path holds remote_path as of now."""
+    if sidecar is None:
+        return
+    st = local_path.stat()
+    with _SIDECAR_LOCK:
+        sidecar[key] = {
+            "remote": remote_path,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "etag": etag,
+            "remote_mtime": remote_mtime,
+        }
+
+
+def record_part(sidecar: dict[str, dict] | None, key: str | None, remote_path: str, validator: str | None) -> None:
+    """Remember which remote version the .part file under key is a prefix of; validator=None forgets it."""
+    if sidecar is None:
+        return
+    with _SIDECAR_LOCK:
+        if validator is None:
+            sidecar.pop(key, None)
+        else:
+            sidecar[key] = {"remote": remote_path, "validator": validator}
+
+
+def format_size(n: float) -> str:
+    """Format a byte count for display, e.g. 1536 -> '1.5 KiB'."""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}" if unit != "B" else f"{int(n)} B"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+def preallocate(f, size: int | None) -> None:
+    """Reserve size bytes for f on disk before streaming into it, where the platform supports it.
+    This extends the file to size; callers truncate to the written length afterwards."""
+    if not size or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(f.fileno(), 0, size)
+    except OSError:
+        pass  # 文件系统不支持预分配时直接写入
+
+
+def copy_to_file(resp: http.client.HTTPResponse, f, on_chunk: Callable[[int], None] | None = None) -> None:
+    """Stream resp into f through a single reusable buffer, without allocating a bytes object per chunk.
+    on_chunk is called with the size of every chunk written."""
+    buf = bytearray(DOWNLOAD_CHUNK_SIZE)
+    view = memoryview(buf)
+    while n := resp.readinto(buf):
+        if _CANCEL_DOWNLOADS.is_set():
+            raise InterruptedError("download cancelled")
+        f.write(view[:n])
+        if on_chunk is not None:
+            on_chunk(n)
+
+
+def copy_with_progress(resp: http.client.HTTPResponse, f, done: int, total: int | None) -> None:
+    """Stream resp into f, drawing a progress line with speed.
+    done is the number of bytes already present (resume offset), total the final size if known."""
+    start = last = time.monotonic()
+    received = 0
+
+    def draw() -> None:
+        speed = format_size(received / max(time.monotonic() - start, 1e-6))
+        if total:
+            pct = (done + received) * 100 / total
+            bar = "#" * int(pct / 5)
+            line = f"  [{bar:<20}] {pct:5.1f}%  {format_size(done + received)}  {speed}/s"
+        else:
+            line = f"  {format_size(done + received)}  {speed}/s"
+        sys.stdout.write(f"\r{line:<60}")
+        sys.stdout.flush()
+
+    def on_chunk(n: int) -> None:
+        nonlocal received, last
+        received += n
+        now = time.monotonic()
+        if now - last >= 0.2:
+            draw()
+            last = now
+
+    copy_to_file(resp, f, on_chunk)
+    draw()
+    sys.stdout.write("\n")
+
+
+def download_file(
+    base_url: str,
+    remote_path: str,
+    local_path: Path,
+    expected_size: int | None = None,
+    progress: bool = False,
+    external_downloader: bool = False,
+    save_dir: Path | None = None,
+    remote_mtime: int | None = None,
+) -> tuple[bool, bool]:
     """Download a single file. Skip if local file exists with same size.
+    expected_size is the remote size if already known (e.g. from a listing); otherwise a HEAD request is made.
+    The file is streamed over the shared connection pool; progress=True draws a progress line.
+    external_downloader=True uses wget or curl instead when installed; without progress they run quietly
+    (curl still prints errors), so concurrent folder jobs don't interleave progress bars.
+    If save_dir is given, the download is recorded in its sidecar (see load_sidecar) together with the
+    server's ETag and remote_mtime (the listing mtime). A local file matching its record is skipped
+    without a request only when both the listing size and mtime agree with the record; otherwise it is
+    revalidated with If-None-Match. The file is written to "<name>.part" first; an interrupted .part is
+    resumed only while the remote file is unchanged (If-Range with the validator recorded in the sidecar),
+    so resuming needs save_dir. Call save_sidecar() afterwards to persist, also when interrupted.
     Returns (success, skipped). success=True means file is available (including skip case)."""
-    url = urljoin(base_url + "/", remote_path.lstrip("/"))
+    url = file_url(base_url, remote_path)
     local_path = local_path.resolve()
     local_path.parent.mkdir(parents=True, exist_ok=True)
 
+    sidecar = key = None
+    if save_dir is not None:
+        save_dir = save_dir.resolve()
+        key = sidecar_key(save_dir, local_path)
+        if key is not None:
+            sidecar = load_sidecar(save_dir)
+
+    tool = None
+    if external_downloader:
+        tool = "wget" if shutil.which("wget") else "curl" if shutil.which("curl") else None
+
+    # 下载先写入 .part，成功后再改名，中断（包括被强杀）时不会留下看似完整的文件
+    part_path = local_path.with_name(local_path.name + ".part")
+    remote_size = expected_size
+    known_etag = None  # 本地文件对应的 ETag，用于条件请求
     if local_path.exists() and local_path.is_file():
-        remote_size = get_remote_size(base_url, remote_path)
-        if remote_size is not None and remote_size >= 0 and local_path.stat().st_size == remote_size:
+        st = local_path.stat()
+        entry = sidecar.get(key) if sidecar is not None else None
+        if entry and not (
+            entry.get("remote") == remote_path
+            and entry.get("size") == st.st_size
+            and entry.get("mtime_ns") == st.st_mtime_ns
+        ):
+            entry = None  # 本地文件在上次下载后被改动，记录不再可信
+        if entry is not None:
+            # 本地文件是上次完整下载的内容：列表的大小和修改时间都与记录一致才直接跳过
+            known_etag = entry.get("etag")
+            recorded_mtime = entry.get("remote_mtime")
+            if remote_mtime is not None and recorded_mtime == remote_mtime and expected_size == st.st_size:
+                return (True, True)
+            if known_etag is None and (remote_mtime is None or recorded_mtime is None):
+                entry = None  # 既没有 ETag 也无法比较修改时间，退回按大小判断
+            # 否则有 ETag 时交给服务端判断；没有 ETag 但远程修改时间已变，直接重新下载
+        if entry is None:
+            if remote_size is None:
+                remote_size = get_remote_size(base_url, remote_path)
+            if remote_size is not None and st.st_size == remote_size:
+                record_download(sidecar, key, remote_path, local_path, None, None)
+                return (True, True)
+
+    offset = 0  # .part 中已有的字节数，>0 时断点续传
+    part_key = key + ".part" if sidecar is not None else None
+    validator = None  # .part 所属的远程版本，续传时用 If-Range 确认远程文件没有变化
+    if part_path.is_file():
+        part_entry = sidecar.get(part_key) if sidecar is not None else None
+        if part_entry is not None and part_entry.get("remote") == remote_path:
+            validator = part_entry.get("validator")
+        if known_etag is None and validator is not None and remote_size is None:
+            remote_size = get_remote_size(base_url, remote_path)
+        part_size = part_path.stat().st_size
+        if known_etag is None and validator is not None and remote_size is not None and part_size < remote_size:
+            offset = part_size
+        else:
+            # 没有记录所属版本，或长度不小于远程大小（可能是预分配后被强杀留下的）的 .part 内容不可信，从头下载
+            part_path.unlink()
+            validator = None
+
+    if known_etag is not None and tool is not None:
+        # wget/curl 不能正确处理 304，先发条件 HEAD 询问
+        with open_url(url, method="HEAD", headers={"If-None-Match": known_etag}, timeout=10) as resp:
+            resp.read()
+            not_modified = resp.status == 304
+        if not_modified:
+            record_download(sidecar, key, remote_path, local_path, known_etag, remote_mtime)
             return (True, True)
 
-    if shutil.which("wget"):
+    if tool is not None:
+        # wget/curl 续传时不能带 If-Range，先确认远程版本与 .part 记录的一致
+        current = get_remote_validator(base_url, remote_path)
+        if offset and current != validator:
+            part_path.unlink()
+            offset = 0
+        validator = current
+        record_part(sidecar, part_key, remote_path, validator)
+
+    etag = None
+    if tool == "wget":
         ret = subprocess.run(
-            ["wget", "--show-progress", "-O", str(local_path), url],
+            ["wget", "--show-progress" if progress else "-q", *(["-c"] if offset else []), "-O", str(part_path), url],
             check=False,
         )
-    elif shutil.which("curl"):
+    elif tool == "curl":
         ret = subprocess.run(
-            ["curl", "-#", "-f", "-L", "-o", str(local_path), url],
+            ["curl", "-#" if progress else "-sS", "-f", "-L", *(["-C", "-"] if offset else []), "-o", str(part_path), url],
             check=False,
         )
     else:
-        req = Request(url)
-        with urlopen(req, timeout=60) as resp:
-            with open(local_path, "wb") as f:
-                while chunk := resp.read(8192):
-                    f.write(chunk)
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator  # 远程文件已变化时服务端返回 200 和完整的新内容
+        if known_etag is not None:
+            headers["If-None-Match"] = known_etag
+        with open_url(url, headers=headers, timeout=60) as resp:
+            if resp.status == 304:
+                resp.read()
+                record_download(sidecar, key, remote_path, local_path, known_etag, remote_mtime)
+                return (True, True)
+            # 服务端不支持 Range 或远程文件已变化时返回 200 和完整内容，此时从头写入
+            done = offset if resp.status == 206 else 0
+            length = resp.getheader("Content-Length")
+            total = done + int(length) if length is not None else None
+            etag = resp.getheader("ETag")
+            if not done:
+                record_part(sidecar, part_key, remote_path, response_validator(resp))
+            with open(part_path, "r+b" if done else "wb") as f:
+                f.seek(done)
+                if not done:
+                    preallocate(f, total)
+                try:
+                    if progress:
+                        copy_with_progress(resp, f, done, total)
+                    else:
+                        copy_to_file(resp, f)
+                finally:
+                    f.truncate()  # 截掉预分配但未写入的部分，保证中断后能按 .part 长度续传
         ret = subprocess.CompletedProcess([], 0)
+    if ret.returncode == 0:
+        os.replace(part_path, local_path)
+        record_part(sidecar, part_key, remote_path, None)
+        record_download(sidecar, key, remote_path, local_path, etag, remote_mtime)
     return (ret.returncode == 0, False)
 
 
-def collect_files_recursive(base_url: str, remote_path: str) -> list[str]:
-    """Recursively collect all file paths under a folder."""
+def collect_files_recursive(base_url: str, remote_path: str) -> list[tuple[str, int | None, int | None]]:
+    """Recursively collect all files under a folder, returns [(path, size, mtime), ...].
+    Directories are listed concurrently; each subdirectory is queued as soon as its parent listing arrives."""
+    # dufs 没有一次性返回整棵目录树的接口：?q= 搜索要求非空关键字且只按文件名匹配，
+    # WebDAV PROPFIND 只支持 Depth 0/1，因此只能逐个目录列出
     files = []
-    items = list_directory(base_url, remote_path)
-    for name, is_dir in items:
-        if name in (".", ".."):
-            continue
-        child_path = f"{remote_path.rstrip('/')}/{name}" if remote_path else name
-        if is_dir:
-            files.extend(collect_files_recursive(base_url, child_path))
-        else:
-            files.append(child_path)
+    pending: deque[str] = deque([remote_path])  # 已发现、尚未提交列目录的目录
+    with ThreadPoolExecutor(max_workers=CRAWL_WORKERS) as ex:
+        try:
+            running: dict[Future, str] = {}
+            while pending or running:
+                while pending:
+                    dir_path = pending.popleft()
+                    running[ex.submit(list_directory, base_url, dir_path)] = dir_path
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    dir_path = running.pop(fut)
+                    parent_prefix = dir_path.rstrip("/") + "/" if dir_path else ""
+                    for name, is_dir, size, mtime in fut.result():
+                        if name in (".", ".."):
+                            continue
+                        child_path = parent_prefix + name
+                        if is_dir:
+                            pending.append(child_path)
+                        else:
+                            files.append((child_path, size, mtime))
+        except KeyboardInterrupt:
+            ex.shutdown(wait=False, cancel_futures=True)
+            raise
     return files
 
 
@@ -152,17 +649,21 @@ def download_folder(
     remote_path: str,
     local_base: Path,
     skipped_filtered: list[str] | None = None,
+    external_downloader: bool = False,
 ) -> None:
     """Recursively download a folder."""
     if skipped_filtered is None:
         skipped_filtered = []
     folder_skipped: list[str] = []  # 本文件夹内因过滤未下载的文件
+    invalidate_listings()  # 下载前重新获取目录树，避免使用过期的缓存
     files = collect_files_recursive(base_url, remote_path)
     folder_name = remote_path.rstrip("/").split("/")[-1] or "download"
     target_dir = local_base / folder_name
     prefix = remote_path.rstrip("/") + "/"
+    plen = len(prefix)
     print(f"Downloading {len(files)} file(s) to {target_dir}")
-    for file_path in files:
+    jobs: list[tuple[str, Path, int | None, int | None]] = []
+    for file_path, size, mtime in files:
         filename = Path(file_path).name
         if filename in SKIP_FILENAMES:
             skipped_filtered.append(file_path)
@@ -170,18 +671,58 @@ def download_folder(
             print(f"  ⊘ skipped (filter): {filename}")
             continue
         if file_path.startswith(prefix):
-            rel = file_path[len(prefix) :]
+            rel = file_path[plen:]
         else:
             rel = file_path
-        local_file = target_dir / rel
+        jobs.append((file_path, target_dir / rel, size, mtime))
+
+    _CANCEL_DOWNLOADS.clear()
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as ex:
         try:
-            ok, skipped = download_file(base_url, file_path, local_file)
-            if ok:
-                print(f"  {'⊙ skipped (exists)' if skipped else '✓'}: {local_file.name}")
-            else:
-                print(f"  ✗ failed: {file_path}")
-        except Exception as e:
-            print(f"  ✗ failed: {file_path}: {e}")
+            # 列表未提供大小（?simple 格式）且本地已存在、没有下载记录的文件，先批量并发查询远程大小
+            base = local_base.resolve()
+            sidecar = load_sidecar(base)
+            unknown = [
+                i
+                for i, (_, local_file, size, _) in enumerate(jobs)
+                if size is None and local_file.is_file() and sidecar_key(base, local_file) not in sidecar
+            ]
+            if unknown:
+                sizes = ex.map(lambda i: get_remote_size(base_url, jobs[i][0]), unknown)
+                for i, remote_size in zip(unknown, sizes):
+                    jobs[i] = (jobs[i][0], jobs[i][1], remote_size, jobs[i][3])
+
+            # 并发下载，结果在主线程按完成顺序打印
+            futures = {
+                ex.submit(
+                    download_file,
+                    base_url,
+                    file_path,
+                    local_file,
+                    size,
+                    external_downloader=external_downloader,
+                    save_dir=local_base,
+                    remote_mtime=mtime,
+                ): (file_path, local_file)
+                for file_path, local_file, size, mtime in jobs
+            }
+            for fut in as_completed(futures):
+                file_path, local_file = futures[fut]
+                try:
+                    ok, skipped = fut.result()
+                    if ok:
+                        print(f"  {'⊙ skipped (exists)' if skipped else '✓'}: {local_file.name}")
+                    else:
+                        print(f"  ✗ failed: {file_path}")
+                except Exception as e:
+                    print(f"  ✗ failed: {file_path}: {e}")
+        except KeyboardInterrupt:
+            # 取消排队中的下载，并让正在进行的下载尽快中止
+            _CANCEL_DOWNLOADS.set()
+            ex.shutdown(wait=False, cancel_futures=True)
+            save_sidecar(local_base.resolve())  # 保存 .part 所属的远程版本，下次才能续传
+            raise
+    save_sidecar(local_base.resolve())
 
     # 下载完成：若有因过滤未下载的文件，用红色打印
     if folder_skipped:
@@ -190,21 +731,51 @@ def download_folder(
             print(f"  {RED}{p}{RESET}")
 
 
+def download_single_file(
+    base_url: str,
+    remote_path: str,
+    save_dir: Path,
+    skipped_filtered: list[str],
+    external_downloader: bool = False,
+) -> None:
+    """Download one file into save_dir with progress, unless its name is in SKIP_FILENAMES."""
+    name = remote_path.rsplit("/", 1)[-1]
+    if name in SKIP_FILENAMES:
+        skipped_filtered.append(remote_path)
+        print(f"{RED}Skipped (filter): {name}{RESET}")
+        return
+    local_file = save_dir / name
+    # 列表中的大小可能已过期，不作为下载依据，由 download_file 向服务端确认
+    try:
+        ok, skipped = download_file(
+            base_url,
+            remote_path,
+            local_file,
+            progress=True,
+            external_downloader=external_downloader,
+            save_dir=save_dir,
+        )
+    finally:
+        save_sidecar(save_dir)
+    if ok:
+        print(f"{'Skipped (exists)' if skipped else 'Downloaded'}: {local_file}")
+    else:
+        print(f"Download failed: {remote_path}")
+
+
 def is_directory(base_url: str, path: str) -> bool:
-    """Check if path is a directory."""
-    items = list_directory(base_url, path if "/" in path else "")
-    if not path or path == "/":
+    """Check if path is a directory, by looking it up in its parent's listing."""
+    path = path.strip("/")
+    if not path:
         return True
-    parent = "/".join(path.rstrip("/").split("/")[:-1])
-    name = path.rstrip("/").split("/")[-1]
-    parent_items = list_directory(base_url, parent) if parent else list_directory(base_url, "")
-    for n, is_dir in parent_items:
+    parent, _, name = path.rpartition("/")
+    for n, is_dir, _, _ in list_directory(base_url, parent):
         if n == name:
             return is_dir
     return False
 
 
-def interactive_download(base_url: str, save_dir: Path) -> None:
+def interactive_download(base_url: str, save_dir: Path, external_downloader: bool = False) -> None:
     """Interactive download main loop."""
     current_path = ""
     skipped_filtered: list[str] = []
@@ -222,14 +793,19 @@ def interactive_download(base_url: str, save_dir: Path) -> None:
         if not items:
             print("(empty directory)")
         else:
-            for i, (name, is_dir) in enumerate(items, 1):
-                icon = "[dir]" if is_dir else "[file]"
-                print(f"  {i:3}. {icon} {name}")
+            # 一次性写出整个列表，避免大目录逐行 print
+            sys.stdout.write(
+                "".join(
+                    f"  {i:3}. {'[dir]' if is_dir else '[file]'} {name}\n"
+                    for i, (name, is_dir, _, _) in enumerate(items, 1)
+                )
+            )
 
         print("\nCommands:")
         print("  - number (e.g. 1): enter dir or download file")
         print("  - d+number (e.g. d1): download selected file or folder")
         print("  - .. or cd ..: go to parent directory")
+        print("  - empty input: refresh listing")
         print("  - q or quit: exit")
         print()
 
@@ -246,6 +822,7 @@ def interactive_download(base_url: str, save_dir: Path) -> None:
             return
 
         if not user_input:
+            invalidate_listings()  # 空输入刷新当前目录
             continue
         if user_input.lower() in ("q", "quit", "exit"):
             if skipped_filtered:
@@ -270,25 +847,16 @@ def interactive_download(base_url: str, save_dir: Path) -> None:
         if user_input.isdigit():
             idx = int(user_input)
             if 1 <= idx <= len(items):
-                name, is_dir = items[idx - 1]
+                name, is_dir, _, _ = items[idx - 1]
                 target_path = f"{current_path}/{name}".strip("/") if current_path else name
                 if is_dir and not force_download:
                     current_path = target_path
                 else:
                     try:
                         if is_dir:
-                            download_folder(base_url, target_path, save_dir, skipped_filtered)
+                            download_folder(base_url, target_path, save_dir, skipped_filtered, external_downloader)
                         else:
-                            if name in SKIP_FILENAMES:
-                                skipped_filtered.append(target_path)
-                                print(f"{RED}Skipped (filter): {name}{RESET}")
-                            else:
-                                local_file = save_dir / name
-                                ok, skipped = download_file(base_url, target_path, local_file)
-                                if ok:
-                                    print(f"{'Skipped (exists)' if skipped else 'Downloaded'}: {local_file}")
-                                else:
-                                    print(f"Download failed: {target_path}")
+                            download_single_file(base_url, target_path, save_dir, skipped_filtered, external_downloader)
                     except Exception as e:
                         print(f"Download failed: {e}")
             else:
@@ -297,25 +865,16 @@ def interactive_download(base_url: str, save_dir: Path) -> None:
 
         name = user_input
         target_path = f"{current_path}/{name}".strip("/") if current_path else name
-        matched = [(n, d) for n, d in items if n == name]
+        matched = [item for item in items if item[0] == name]
         if not matched:
             print("Not found")
             continue
-        _, is_dir = matched[0]
+        _, is_dir, _, _ = matched[0]
         if is_dir:
             current_path = target_path
         else:
             try:
-                if name in SKIP_FILENAMES:
-                    skipped_filtered.append(target_path)
-                    print(f"{RED}Skipped (filter): {name}{RESET}")
-                else:
-                    local_file = save_dir / name
-                    ok, skipped = download_file(base_url, target_path, local_file)
-                    if ok:
-                        print(f"{'Skipped (exists)' if skipped else 'Downloaded'}: {local_file}")
-                    else:
-                        print(f"Download failed: {target_path}")
+                download_single_file(base_url, target_path, save_dir, skipped_filtered, external_downloader)
             except Exception as e:
                 print(f"Download failed: {e}")
 
@@ -335,6 +894,11 @@ def main():
         default=Path(__file__).resolve().parent,
         help="Download save directory (default: script directory)",
     )
+    parser.add_argument(
+        "--external-downloader",
+        action="store_true",
+        help="Download with wget or curl (if installed) instead of the built-in downloader",
+    )
     args = parser.parse_args()
 
     base_url = normalize_base_url(args.url)
@@ -353,7 +917,7 @@ def main():
         print("Check server address, port and network connection")
         sys.exit(1)
 
-    interactive_download(base_url, save_dir)
+    interactive_download(base_url, save_dir, args.external_downloader)
 
 
 if __name__ == "__main__":